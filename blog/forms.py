@@ -18,7 +18,7 @@ class TagForm(forms.ModelForm):
 
         if new_slug == 'create':
             raise ValidationError('Slug may not be "Create"')
-        if Tag.objects.filter(slug__iexact=new_slug).count():
+        if Tag.objects.filter(slug__exact=new_slug).exists():
             raise ValidationError('Slug must be unique. We have "{}" slug already'.format(new_slug))
         return new_slug
 
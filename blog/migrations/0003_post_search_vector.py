@@ -0,0 +1,53 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class PostgresOnlyAddIndex(migrations.AddIndex):
+    """AddIndex, создающий индекс только на PostgreSQL.
+
+    На остальных базах (например SQLite) GIN-индекс не поддерживается,
+    поэтому операция меняет только состояние моделей.
+
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def fill_search_vector(apps, schema_editor):
+    """Заполняет search_vector для уже существующих постов (только на PostgreSQL)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from django.contrib.postgres.search import SearchVector
+
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(
+        search_vector=SearchVector('title', weight='A') + SearchVector('body', weight='B')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_auto_20180725_0926'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        PostgresOnlyAddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_gin'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
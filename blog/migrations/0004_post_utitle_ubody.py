@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+def fill_upper_columns(apps, schema_editor):
+    """Заполняет utitle/ubody для уже существующих постов."""
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.update(utitle=Upper('title'), ubody=Upper('body'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='utitle',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='ubody',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_upper_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class PostgresOnlyAddIndex(migrations.AddIndex):
+    """AddIndex, создающий индекс только на PostgreSQL.
+
+    На остальных базах (например SQLite) триграммный GIN-индекс не
+    поддерживается, поэтому операция меняет только состояние моделей.
+
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_utitle_ubody'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PostgresOnlyAddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title', 'body'], name='post_trgm',
+                opclasses=['gin_trgm_ops', 'gin_trgm_ops']),
+        ),
+    ]
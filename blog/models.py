@@ -1,9 +1,24 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.cache import cache
+from django.db import connection, models
 from django.shortcuts import reverse
 from django.utils.text import slugify
 from time import time
 
 
+def detail_cache_keys(model_name, slug):
+    """Функция, возвращающая ключи кеша страницы объекта
+
+    На входе принимает имя модели и слаг. Возвращает ключи обоих вариантов
+    закешированной страницы (для обычного и staff-пользователя), чтобы их
+    можно было сбросить при изменении или удалении объекта.
+
+    """
+
+    return ['detail:{}:{}:{}'.format(model_name, slug, flag) for flag in (0, 1)]
+
+
 def gen_slug(s):
     """Функция генерации уникального слага
 
@@ -21,6 +36,11 @@ class Post(models.Model):
     body = models.TextField(blank=True, db_index=True)
     tags = models.ManyToManyField('Tag', blank=True, related_name='posts')
     date_pub = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # upper() может удлинять строку (например 'ß' -> 'SS'), поэтому запас по длине
+    utitle = models.CharField(max_length=300, blank=True, editable=False, db_index=True)
+    ubody = models.TextField(blank=True, editable=False)
 
     def get_absolute_url(self):
         return reverse('post_detail_url', kwargs={'slug': self.slug})
@@ -37,12 +57,35 @@ class Post(models.Model):
         Производится проверка на наличие параметра id у сохраняемого поста(т.е. сохраняется новый пост,
         а не изменяется существующий). В случае успешной проверки создается уникальный слаг для поста.
         Если проверка не пройдена - новый слаг не создается.
+        Перед сохранением заполняются поля utitle/ubody (заглавные копии title/body
+        для поиска через btree-индекс). После сохранения на PostgreSQL обновляется
+        поле search_vector, по которому выполняется полнотекстовый поиск в posts_list,
+        и сбрасывается кеш страницы поста.
 
         """
 
         if not self.id:
             self.slug = gen_slug(self.title)
+        self.utitle = self.title.upper()
+        self.ubody = self.body.upper()
         super().save(*args, **kwargs)
+        if connection.vendor == 'postgresql':
+            Post.objects.filter(pk=self.pk).update(
+                search_vector=SearchVector('title', weight='A') + SearchVector('body', weight='B')
+            )
+        cache.delete_many(detail_cache_keys('post', self.slug))
+
+    def delete(self, *args, **kwargs):
+        """Переопределение метода delete
+
+        После удаления поста сбрасывает кеш страницы поста, чтобы удаленный
+        пост не продолжал отдаваться из кеша.
+
+        """
+
+        slug = self.slug
+        super().delete(*args, **kwargs)
+        cache.delete_many(detail_cache_keys('post', slug))
 
 
     def __str__(self):
@@ -50,6 +93,12 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-date_pub']
+        indexes = [
+            models.Index(fields=['-date_pub'], name='post_date_pub_desc'),
+            GinIndex(fields=['search_vector'], name='post_search_vector_gin'),
+            GinIndex(fields=['title', 'body'], name='post_trgm',
+                     opclasses=['gin_trgm_ops', 'gin_trgm_ops']),
+        ]
 
 
 class Tag(models.Model):
@@ -65,6 +114,30 @@ class Tag(models.Model):
     def get_delete_url(self):
         return reverse('tag_delete_url', kwargs={'slug': self.slug})
 
+    def save(self, *args, **kwargs):
+        """Переопределение метода save
+
+        После сохранения тега сбрасывает кеш списка тегов, чтобы tags_list
+        не отдавал устаревшие данные, и кеш страницы тега.
+
+        """
+
+        super().save(*args, **kwargs)
+        cache.delete('all_tags')
+        cache.delete_many(detail_cache_keys('tag', self.slug))
+
+    def delete(self, *args, **kwargs):
+        """Переопределение метода delete
+
+        После удаления тега сбрасывает кеш списка тегов и кеш страницы тега.
+
+        """
+
+        slug = self.slug
+        super().delete(*args, **kwargs)
+        cache.delete('all_tags')
+        cache.delete_many(detail_cache_keys('tag', slug))
+
     def __str__(self):
         return '{}'.format(self.title)
 
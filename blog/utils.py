@@ -1,3 +1,7 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import render
 from django.shortcuts import redirect
 from django.shortcuts import get_object_or_404
@@ -5,24 +9,71 @@ from django.shortcuts import get_object_or_404
 from .models import *
 
 
-class ObjectDetailMixin:
-    """Миксин, получающий объект"""
+class ObjectLookupMixin:
+    """Миксин, получающий объект из базы по слагу"""
 
     model = None
+    model_name = None
+    prefetch_related = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Вычисляет имя модели один раз при объявлении класса-наследника.
+
+        Имя модели используется как ключ контекста в шаблонах; раньше оно
+        вычислялось заново на каждый запрос.
+
+        """
+
+        super().__init_subclass__(**kwargs)
+        if cls.model is not None:
+            cls.model_name = cls.model.__name__.lower()
+
+    def get_object(self, slug):
+        """Метод, получающий объект по заданному слагу.
+
+        На входе принимает параметр slug. Пытается получить объект из базы по заданному
+        слагу (связанные объекты из prefetch_related подгружаются одним дополнительным
+        запросом). Слаги хранятся в нижнем регистре, поэтому поиск идет точным
+        совпадением по уникальному индексу. Если такой объект отсутствует -
+        возвращает ошибку 404.
+
+        """
+
+        queryset = self.model.objects.prefetch_related(*self.prefetch_related)
+        return get_object_or_404(queryset, slug__exact=slug.lower())
+
+
+class ObjectDetailMixin(ObjectLookupMixin):
+    """Миксин, получающий объект"""
+
     template = None
+    cache_timeout = 60 * 5  # время жизни кеша страницы объекта
 
-    def get(self, request, slug):
+    async def get(self, request, slug):
         """Метод, обрабатывающий GET-запрос для получения объекта.
 
-        На входе принимает параметры request и slug. По slug пытается получить объект из
-        базы по заданному слагу. Если такой объект отсутствует - возвращает ошибку 404. Если
-        объект существует - возвращает страницу с объектом.
+        На входе принимает параметры request и slug. Сначала пытается отдать страницу
+        из кеша (страница кешируется в двух вариантах - для обычного и staff-пользователя,
+        кеш сбрасывается в save/delete модели). При отсутствии в кеше по slug пытается
+        получить объект из базы по заданному слагу. Если такой объект отсутствует -
+        возвращает ошибку 404. Если объект существует - возвращает страницу с объектом
+        и сохраняет ее в кеш. Метод асинхронный: обращения к базе, кешу и отрисовка
+        шаблона не блокируют event loop.
 
         """
 
-        obj = get_object_or_404(self.model, slug__iexact=slug)
-        return render(request, self.template,
-                      context={self.model.__name__.lower(): obj, 'admin_object': obj, 'detail': True})
+        is_staff = await sync_to_async(lambda: request.user.is_staff)()
+        cache_key = 'detail:{}:{}:{}'.format(self.model_name, slug.lower(), int(is_staff))
+        content = await cache.aget(cache_key)
+        if content is not None:
+            return HttpResponse(content)
+
+        obj = await sync_to_async(self.get_object)(slug)
+        response = await sync_to_async(render)(
+            request, self.template,
+            context={self.model_name: obj, 'admin_object': obj, 'detail': True})
+        await cache.aset(cache_key, response.content, self.cache_timeout)
+        return response
 
 
 class ObjectCreateMixin:
@@ -30,39 +81,45 @@ class ObjectCreateMixin:
 
     model_form = None  # задаем None в качестве значения по умолчанию для формы
     template = None  # задаем None в качестве значения по умолчанию для шаблона
+    blank_form = None  # кеш пустой формы, создается один раз на класс
 
     def get(self, request):
         """Метод, обрабатывающий GET-запрос при создании объекта.
 
         На входе принимает параметр request. Возвращает отрисованный шаблон с формой для
-        создания соответствующего объекта(тега или поста).
+        создания соответствующего объекта(тега или поста). Пустая форма не содержит
+        состояния запроса, поэтому создается один раз и переиспользуется; варианты
+        выбора (например список тегов) querysets перечитывают из базы при каждой
+        отрисовке, так что устаревания данных не происходит.
 
         """
 
-        form = self.model_form()
-        return render(request, self.template, context={'form': form})
+        if self.__class__.blank_form is None:
+            self.__class__.blank_form = self.model_form()
+        return render(request, self.template, context={'form': self.blank_form})
 
     def post(self, request):
         """Метод, обрабатывающий POST-запрос при создании объекта.
 
         На входе принимает параметр request. Из POST-запроса получает данные из заполненной формы.
-        Осуществляет валидацию данных. В случае успеха сохраняет данные из формы и перенаправляет на
-        созданный объект. В противном случае возвращает заполненную форму с указанной ошибкой.
+        Осуществляет валидацию данных. В случае успеха сохраняет данные из формы одной транзакцией
+        (сам объект и связи many-to-many) и перенаправляет на созданный объект. В противном случае
+        возвращает заполненную форму с указанной ошибкой.
 
         """
 
         bound_form = self.model_form(request.POST)
 
         if bound_form.is_valid():
-            new_obj = bound_form.save()
+            with transaction.atomic():
+                new_obj = bound_form.save()
             return redirect(new_obj)
         return render(request, self.template, context={'form': bound_form})
 
 
-class ObjectUpdateMixin:
+class ObjectUpdateMixin(ObjectLookupMixin):
     """Миксин, производящий изменения в объекте"""
 
-    model = None
     model_form = None
     template = None
 
@@ -70,13 +127,14 @@ class ObjectUpdateMixin:
         """Метод, обрабатывающий GET-запрос при изменении объекта.
 
         На входе принимает параметры request и slug. По slug получает объект из базы.
+        Если объект отсутствует - возвращает ошибку 404.
         Возвращает соответствующую форму(тег или поста) с заполненными данными по заданному slug.
 
         """
 
-        obj = self.model.objects.get(slug__iexact=slug)
+        obj = self.get_object(slug)
         bound_form = self.model_form(instance=obj)
-        return render(request, self.template, context={'form': bound_form, self.model.__name__.lower(): obj})
+        return render(request, self.template, context={'form': bound_form, self.model_name: obj})
 
     def post(self, request, slug):
         """Метод, обрабатывающий POST-запрос при обновлении объекта.
@@ -89,41 +147,45 @@ class ObjectUpdateMixin:
 
         """
 
-        obj = self.model.objects.get(slug__iexact=slug)
+        obj = self.get_object(slug)
         bound_form = self.model_form(request.POST, instance=obj)
 
         if bound_form.is_valid():
             new_obj = bound_form.save()
             return redirect(new_obj)
-        return render(request, self.template, context={'form': bound_form, self.model.__name__.lower(): obj})
+        return render(request, self.template, context={'form': bound_form, self.model_name: obj})
 
 
-class ObjectDeleteMixin:
+class ObjectDeleteMixin(ObjectLookupMixin):
     """Миксин, производящий удаление объекта"""
 
-    model = None
     template = None
     redirect_url = None
+    redirect_to = None  # кеш готового URL для перенаправления, вычисляется один раз на класс
 
     def get(self, request, slug):
         """Метод, обрабатывающий GET-запрос при удалении объекта
 
         На входе принимает параметры request и slug. По slug получает объект из базы.
+        Если объект отсутствует - возвращает ошибку 404.
         Возвращает соответствующую форму(тег или поста) с заполненными данными по заданному slug.
 
         """
 
-        obj = self.model.objects.get(slug__iexact=slug)
-        return render(request, self.template, context={self.model.__name__.lower(): obj})
+        obj = self.get_object(slug)
+        return render(request, self.template, context={self.model_name: obj})
 
     def post(self, request, slug):
         """Метод, обрабатывающий POST-запрос при обновлении объекта.
 
         На входе принимает параметры request и slug. По slug получает объект из базы и удаляет
-        его. Затем перенаправляет на страницу со списком объектов
+        его. Затем перенаправляет на страницу со списком объектов. URL списка не зависит
+        от запроса, поэтому reverse вычисляется один раз на класс.
 
         """
 
-        obj = self.model.objects.get(slug__iexact=slug)
+        obj = self.get_object(slug)
         obj.delete()
-        return redirect(reverse(self.redirect_url))
+        if self.__class__.redirect_to is None:
+            self.__class__.redirect_to = reverse(self.redirect_url)
+        return HttpResponseRedirect(self.redirect_to)
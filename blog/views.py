@@ -1,52 +1,96 @@
+from asgiref.sync import sync_to_async
 from django.views.generic import View
 from .models import Post, Tag
 from .utils import *
 from .forms import TagForm, PostForm
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
-from django.db.models import Q
-
-def posts_list(request):
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from urllib.parse import urlencode
+
+POSTS_PER_PAGE = 10
+
+# Служебные маркеры подсветки для ts_headline: не HTML, чтобы текст поста
+# можно было экранировать целиком, а потом заменить маркеры на <mark>.
+HEADLINE_START = '\x02'
+HEADLINE_STOP = '\x03'
+
+async def posts_list(request):
     """ Функция для отображения списка постов.
 
     На входе принимает параметр request.
     Выполняет следующие функции:
     1. отображает список все постов в блоге
-    2. при указании в поисковой строке ключевого слова - отображает список постов с найденным ключевым
-    словом.
-    3. реализует пагинацию страниц
+    2. при указании в поисковой строке ключевого слова - выполняет полнотекстовый поиск
+    по полю search_vector (GIN-индекс) и отдает посты по релевантности со страничной
+    пагинацией (параметр ?page=<N>, LIMIT N+1 вместо COUNT(*)). На базах без
+    полнотекстового поиска (например SQLite) ищет по индексированным полям
+    utitle/ubody.
+    3. для общей ленты реализует курсорную пагинацию страниц по id
+    (параметр ?after=<id>), без COUNT(*) и OFFSET.
     Возвращает страницу со списком постов.
 
     """
     search_query = request.GET.get('search', '')
 
     if search_query:
-        posts = Post.objects.filter(Q(title__icontains=search_query) | Q(body__icontains=search_query))
+        if connection.vendor == 'postgresql':
+            query = SearchQuery(search_query, search_type='websearch')
+            posts = Post.objects.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query),
+                headline=SearchHeadline('body', query, start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP)
+            ).order_by('-rank', '-id')
+        else:
+            upper_query = search_query.upper()
+            posts = Post.objects.filter(
+                Q(utitle__contains=upper_query) | Q(ubody__contains=upper_query)).order_by('-id')
+        posts = posts.prefetch_related('tags').defer('search_vector', 'utitle', 'ubody')
+
+        page_param = request.GET.get('page', '')
+        page_number = int(page_param) if page_param.isdigit() and int(page_param) > 0 else 1
+        offset = (page_number - 1) * POSTS_PER_PAGE
+        page = [post async for post in posts[offset:offset + POSTS_PER_PAGE + 1]]
+        has_next = len(page) > POSTS_PER_PAGE
+        page = page[:POSTS_PER_PAGE]
+
+        if connection.vendor == 'postgresql':
+            for post in page:
+                if post.headline:
+                    post.headline = mark_safe(
+                        escape(post.headline).replace(HEADLINE_START, '<mark>').replace(HEADLINE_STOP, '</mark>'))
+
+        if has_next:
+            next_url = '?{}'.format(urlencode({'search': search_query, 'page': page_number + 1}))
+        else:
+            next_url = ''
+        if page_number > 1:
+            prev_url = '?{}'.format(urlencode({'search': search_query, 'page': page_number - 1}))
+        else:
+            prev_url = ''
     else:
-        posts = Post.objects.all()
-
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page', 1)
-    page = paginator.get_page(page_number)
-    is_paginated = page.has_other_pages()
+        posts = Post.objects.order_by('-id').prefetch_related('tags').defer(
+            'search_vector', 'utitle', 'ubody')
+        after = request.GET.get('after', '')
+        if after.isdigit():
+            posts = posts.filter(id__lt=after)
+        page = [post async for post in posts[:POSTS_PER_PAGE + 1]]
+        has_next = len(page) > POSTS_PER_PAGE
+        page = page[:POSTS_PER_PAGE]
+        next_url = '?after={}'.format(page[-1].id) if has_next else ''
+        prev_url = '?' if after else ''
 
-    if page.has_previous():
-        prev_url = '?page={}'.format(page.previous_page_number())
-    else:
-        prev_url = ''
-
-    if page.has_next():
-        next_url = '?page={}'.format(page.next_page_number())
-    else:
-        next_url = ''
     context = {
         'page_object': page,
-        'is_paginated': is_paginated,
+        'is_paginated': bool(next_url or prev_url),
         'next_url': next_url,
         'prev_url': prev_url
     }
 
-    return render(request, 'blog/index.html', context=context)
+    return await sync_to_async(render)(request, 'blog/index.html', context=context)
 
 
 class PostDetail(ObjectDetailMixin, View):
@@ -61,6 +105,7 @@ class PostDetail(ObjectDetailMixin, View):
 
     model = Post
     template = 'blog/post_detail.html'
+    prefetch_related = ('tags',)
 
 
 class PostCreate(LoginRequiredMixin, ObjectCreateMixin, View):
@@ -133,6 +178,7 @@ class TagDetail(ObjectDetailMixin, View):
 
     model = Tag
     template = 'blog/tag_detail.html'
+    prefetch_related = ('posts__tags',)
 
 
 class TagCreate(LoginRequiredMixin, ObjectCreateMixin, View):
@@ -193,13 +239,18 @@ class TagDelete(LoginRequiredMixin, ObjectDeleteMixin, View):
     raise_exception = True
 
 
-def tags_list(request):
+async def tags_list(request):
     """Функция для отображения списка тегов на странице
 
-     На входе принимает параметр request. Получает все теги, имеющиеся в базе.
+     На входе принимает параметр request. Получает список всех тегов (словари
+     с title и slug) из кеша, а при его отсутствии - из базы (с сохранением
+     в кеш на 15 минут). Кеш сбрасывается при сохранении или удалении тега.
      Возвращает страницу со списком тегов.
 
      """
 
-    tags = Tag.objects.all()
-    return render(request, 'blog/tags_list.html', context={'tags': tags})
+    tags = await cache.aget('all_tags')
+    if tags is None:
+        tags = [tag async for tag in Tag.objects.values('title', 'slug').aiterator(chunk_size=500)]
+        await cache.aset('all_tags', tags, 60 * 15)
+    return await sync_to_async(render)(request, 'blog/tags_list.html', context={'tags': tags})